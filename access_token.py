@@ -1,96 +1,149 @@
-import requests
-from datetime import datetime, timezone
-from eth_account import Account
-from eth_account.messages import encode_defunct
-import os
-from dotenv import load_dotenv
-from typing import Optional, Tuple
-import logging
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-class FractionAIAuth:
-    BASE_URL = "https://dapp-backend-large.fractionai.xyz/api3"
-    HEADERS = {
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "Origin": "https://dapp.fractionai.xyz",
-        "Referer": "https://dapp.fractionai.xyz/",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    }
-
-    def __init__(self, private_key: str):
-        self.private_key = private_key
-        self.wallet_address = Account.from_key(private_key).address
-
-    def fetch_nonce(self) -> Optional[str]:
-        """Fetch authentication nonce with retry mechanism."""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.get(
-                    f"{self.BASE_URL}/auth/nonce",
-                    headers=self.HEADERS,
-                    timeout=10
-                )
-                response.raise_for_status()
-                return response.json().get('nonce')
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Attempt {attempt + 1}/{max_retries} failed: {e}")
-                if attempt == max_retries - 1:
-                    return None
-                continue
-
-    def generate_auth_payload(self, nonce: str) -> Tuple[str, str]:
-        """Generate authentication message and timestamp."""
-        issued_at = datetime.now(timezone.utc).isoformat()
-        message = f"""dapp.fractionai.xyz wants you to sign in with your Ethereum account:
-{self.wallet_address}
-
-Sign in with your wallet to Fraction AI.
-
-URI: https://dapp.fractionai.xyz
-Version: 1
-Chain ID: 11155111
-Nonce: {nonce}
-Issued At: {issued_at}"""
-        return message, issued_at
-
-    def sign_message(self, message: str) -> str:
-        """Sign the authentication message."""
-        encoded_message = encode_defunct(text=message)
-        signed_message = Account.sign_message(encoded_message, self.private_key)
-        return signed_message.signature.hex()
-
-    def verify_dapp_auth(self) -> Optional[str]:
-        """Complete authentication flow and return access token."""
-        nonce = self.fetch_nonce()
-        if not nonce:
-            logger.error("Failed to fetch nonce")
-            return None
-
-        try:
-            message, _ = self.generate_auth_payload(nonce)
-            signature = self.sign_message(message)
-
-            response = requests.post(
-                f"{self.BASE_URL}/auth/verify",
-                headers=self.HEADERS,
-                json={
-                    "message": message,
-                    "referralCode": "D6AF1CEA",
-                    "signature": signature
-                },
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json().get('accessToken')
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Authentication failed: {e}")
-            return None
\ No newline at end of file
+import httpx
+import asyncio
+import functools
+import orjson
+import random
+import secrets
+import time
+from datetime import datetime, timezone
+from eth_account import Account
+from eth_account.messages import encode_defunct
+import os
+from dotenv import load_dotenv
+from typing import Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def _sleep_backoff(attempt: int) -> None:
+    """Sleep with exponential backoff and jitter (base 1s, cap 30s)."""
+    await asyncio.sleep(min(30, 2 ** attempt) * (1 + random.random() * 0.5))
+
+@functools.lru_cache(maxsize=4)
+def _acct(private_key: str):
+    """Cache the derived account; key derivation costs hundreds of µs."""
+    return Account.from_key(private_key)
+
+@functools.lru_cache(maxsize=1)
+def _iso(sec: int) -> str:
+    """ISO-8601 UTC timestamp, cached per wall-clock second."""
+    return datetime.fromtimestamp(sec, timezone.utc).isoformat()
+
+class FractionAIAuth:
+    BASE_URL = "https://dapp-backend-large.fractionai.xyz/api3"
+    HEADERS = {
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "Origin": "https://dapp.fractionai.xyz",
+        "Referer": "https://dapp.fractionai.xyz/",
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+    }
+
+    def __init__(self, private_key: str):
+        self.private_key = private_key
+        self._account = _acct(private_key)
+        self.wallet_address = self._account.address
+        # Address is fixed per instance, so only nonce and timestamp vary.
+        self._siwe_template = (
+            "dapp.fractionai.xyz wants you to sign in with your Ethereum account:\n"
+            f"{self.wallet_address}\n"
+            "\n"
+            "Sign in with your wallet to Fraction AI.\n"
+            "\n"
+            "URI: https://dapp.fractionai.xyz\n"
+            "Version: 1\n"
+            "Chain ID: 11155111\n"
+            "Nonce: %s\n"
+            "Issued At: %s"
+        )
+
+    async def fetch_nonce(self, session: httpx.AsyncClient) -> Optional[str]:
+        """Fetch authentication nonce with retry mechanism."""
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                response = await session.get(
+                    f"{self.BASE_URL}/auth/nonce",
+                    headers=self.HEADERS,
+                    timeout=10.0
+                )
+                response.raise_for_status()
+                return orjson.loads(response.content).get('nonce')
+            except httpx.HTTPError as e:
+                logger.error("Attempt %d/%d failed: %s", attempt + 1, max_retries, e)
+                if attempt == max_retries - 1:
+                    return None
+                await _sleep_backoff(attempt)
+
+    def generate_auth_payload(self, nonce: str) -> Tuple[str, str]:
+        """Generate authentication message and timestamp."""
+        issued_at = _iso(int(time.time()))
+        return self._siwe_template % (nonce, issued_at), issued_at
+
+    def sign_message(self, message: str) -> str:
+        """Sign the authentication message."""
+        encoded_message = encode_defunct(text=message)
+        signed_message = self._account.sign_message(encoded_message)
+        return signed_message.signature.hex()
+
+    async def _verify_batched(self, session: httpx.AsyncClient) -> Optional[str]:
+        """Try single-flight SIWE auth with a client-generated nonce.
+
+        Saves the nonce round-trip when the server accepts it; returns
+        None (without logging an error) when it doesn't, so the caller
+        can fall back to the two-step flow.
+        """
+        nonce = secrets.token_hex(16)
+        message, _ = self.generate_auth_payload(nonce)
+        # ECDSA signing blocks for a few ms; keep the loop free for the
+        # matchmaking workers while the refresh is in flight.
+        signature = await asyncio.to_thread(self.sign_message, message)
+        try:
+            response = await session.post(
+                f"{self.BASE_URL}/auth/siwe",
+                headers=self.HEADERS,
+                content=orjson.dumps({
+                    "message": message,
+                    "referralCode": "D6AF1CEA",
+                    "signature": signature
+                }),
+                timeout=10.0
+            )
+            if response.status_code in (400, 404, 405):
+                return None
+            response.raise_for_status()
+            return orjson.loads(response.content).get('accessToken')
+        except httpx.HTTPError:
+            return None
+
+    async def verify_dapp_auth(self, session: httpx.AsyncClient) -> Optional[str]:
+        """Complete authentication flow and return access token."""
+        token = await self._verify_batched(session)
+        if token:
+            return token
+
+        nonce = await self.fetch_nonce(session)
+        if not nonce:
+            logger.error("Failed to fetch nonce")
+            return None
+
+        try:
+            message, _ = self.generate_auth_payload(nonce)
+            signature = await asyncio.to_thread(self.sign_message, message)
+
+            response = await session.post(
+                f"{self.BASE_URL}/auth/verify",
+                headers=self.HEADERS,
+                content=orjson.dumps({
+                    "message": message,
+                    "referralCode": "D6AF1CEA",
+                    "signature": signature
+                }),
+                timeout=10.0
+            )
+            response.raise_for_status()
+            return orjson.loads(response.content).get('accessToken')
+
+        except httpx.HTTPError as e:
+            logger.error("Authentication failed: %s", e)
+            return None
@@ -1,26 +1,32 @@
-import aiohttp
+import httpx
 import asyncio
+import base64
 import random
 import logging
+import time
 import traceback
 from typing import Dict, List, Optional
 from datetime import datetime
+from pathlib import Path
 import os
+import orjson
 from access_token import FractionAIAuth
 import colorama
 from colorama import Fore, Style
 import json
-from aiohttp import ClientTimeout
-from asyncio import TimeoutError
 from dotenv import load_dotenv
+from bot_logging import setup_logging
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# Precomputed ANSI log formats so hot-path log calls stay lazy: the
+# message is only rendered when the level is actually emitted.
+_MATCH_OK_FMT = Fore.GREEN + "Match initiated successfully with agent %d" + Style.RESET_ALL
+_COOLDOWN_FMT = Fore.YELLOW + "Agent %d in cooldown. Waiting..." + Style.RESET_ALL
+_MATCH_ERR_FMT = Fore.RED + "Error initiating match: %s" + Style.RESET_ALL
+
 class GameSession:
     BASE_URL = "https://dapp-backend-large.fractionai.xyz/api3"
     
@@ -28,11 +34,28 @@ class GameSession:
         self.token = token
         self.user_id = user_id
         self.headers = self._generate_headers()
-        self.agent_ids = [26641, 26733, 26854, 39534, 39294, 39437, 
-                         79691, 79722, 79797, 79661, 79753, 79829, 
-                         85172, 85203, 85248, 85128, 85153]
-        self.entry_fees = [0.0001, 0.001]
-        self.timeout = ClientTimeout(total=30)
+        self._session: Optional[httpx.AsyncClient] = None
+        self._refresh_lock = asyncio.Lock()
+        self._token_exp = self._decode_token_exp(token)
+        self._cooldown_until: Dict[int, float] = {}
+        self._status: Dict[int, str] = {}
+        self.agent_ids = (26641, 26733, 26854, 39534, 39294, 39437,
+                         79691, 79722, 79797, 79661, 79753, 79829,
+                         85172, 85203, 85248, 85128, 85153)
+        self.entry_fees = (0.0001, 0.001)
+        self.timeout = httpx.Timeout(30.0)
+        # Mersenne-Twister seeded once from urandom: fee picks need no
+        # crypto-strength randomness and SystemRandom would syscall per
+        # choice.
+        self._rng = random.Random(os.urandom(8))
+        # Hot-path caches: httpx reuses the pre-validated Headers object,
+        # and the payload is %-formatted bytes instead of a dict +
+        # json.dumps per request.
+        self._headers_md = httpx.Headers(self.headers)
+        self._fee_bytes = tuple(repr(fee).encode() for fee in self.entry_fees)
+        self._payload_template = (
+            b'{"agentId":%d,"entryFees":%s,"sessionTypeId":1,"userId":%d}'
+        )
 
     def _generate_headers(self) -> Dict:
         """Generate request headers with current token."""
@@ -45,79 +68,132 @@ class GameSession:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
 
+    @staticmethod
+    def _decode_token_exp(token: str) -> float:
+        """Extract the `exp` claim from a JWT, or 0 if it can't be parsed."""
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)  # restore base64 padding
+            return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+        except (IndexError, KeyError, ValueError, TypeError):
+            return 0.0
+
     async def refresh_token(self, private_key: str) -> None:
-        """Refresh the authentication token."""
-        auth = FractionAIAuth(private_key)
-        new_token = auth.verify_dapp_auth()
-        if new_token:
-            self.token = new_token
-            self.headers = self._generate_headers()
-            with open("access_token.txt", "w") as file:
-                file.write(new_token)
-            logger.info("Token refreshed successfully")
-        else:
-            logger.error("Failed to refresh token")
-
-    async def initiate_match(self, session: aiohttp.ClientSession, agent_id: int) -> Optional[Dict]:
+        """Refresh the authentication token (single-flight, TTL-aware)."""
+        async with self._refresh_lock:
+            # Another coroutine may have refreshed while we waited on the
+            # lock; skip the round-trip if the token is still fresh.
+            if time.time() < self._token_exp - 60:
+                return
+            auth = FractionAIAuth(private_key)
+            new_token = await auth.verify_dapp_auth(self._session)
+            if new_token:
+                self.token = new_token
+                self._token_exp = self._decode_token_exp(new_token)
+                # Only the Authorization value changes; mutate in place so
+                # the prevalidated Headers object is reused as-is.
+                self.headers["Authorization"] = f"Bearer {new_token}"
+                self._headers_md["Authorization"] = f"Bearer {new_token}"
+                await asyncio.to_thread(Path("access_token.txt").write_text, new_token)
+                logger.info("Token refreshed successfully")
+            else:
+                logger.error("Failed to refresh token")
+
+    async def initiate_match(self, session: httpx.AsyncClient, agent_id: int) -> Optional[Dict]:
+        # Skip agents still in cooldown instead of sleeping in-coroutine,
+        # so a single cooldown can't stall the whole gather.
+        if time.time() < self._cooldown_until.get(agent_id, 0):
+            return None
         try:
-            payload = {
-                "agentId": agent_id,
-                "entryFees": random.choice(self.entry_fees),
-                "sessionTypeId": 1,
-                "userId": self.user_id
-            }
-            
-            async with session.post(
+            content = self._payload_template % (
+                agent_id, self._rng.choice(self._fee_bytes), self.user_id
+            )
+
+            response = await session.post(
                 f"{self.BASE_URL}/matchmaking/initiate",
-                headers=self.headers,
-                json=payload,
+                headers=self._headers_md,
+                content=content,
                 timeout=self.timeout
-            ) as response:
-                data = await response.json()
-                
-                if response.status == 200:
-                    logger.info(f"{Fore.GREEN}Match initiated successfully with agent {agent_id}{Style.RESET_ALL}")
-                    return data
-                elif "error" in data:
-                    if "Not found" in data["error"]:
-                        logger.warning(f"{Fore.YELLOW}Agent {agent_id} in cooldown. Waiting...{Style.RESET_ALL}")
-                        await asyncio.sleep(180)
-                        return None
-                    elif "Invalid token" in data["error"] or "Authentication token required" in data["error"]:
-                        await self.refresh_token(os.getenv('PRIVATE_KEY'))
-                
-                logger.error(f"{Fore.RED}Error initiating match: {data}{Style.RESET_ALL}")
-                await asyncio.sleep(60)
-                return None
-
-        except (TimeoutError, aiohttp.ClientError) as e:
-            logger.error(f"Attempt failed: {e}")
+            )
+            data = orjson.loads(response.content)
+
+            if response.status_code == 200:
+                logger.debug(_MATCH_OK_FMT, agent_id)
+                self._status[agent_id] = "ok"
+                return data
+            elif "error" in data:
+                if "Not found" in data["error"]:
+                    logger.debug(_COOLDOWN_FMT, agent_id)
+                    self._cooldown_until[agent_id] = time.time() + 180
+                    self._status[agent_id] = "cooldown"
+                    return None
+                elif "Invalid token" in data["error"] or "Authentication token required" in data["error"]:
+                    await self.refresh_token(os.getenv('PRIVATE_KEY'))
+
+            # Return immediately so one failing agent doesn't stall the
+            # gather; the outer loop provides the inter-cycle delay.
+            logger.error(_MATCH_ERR_FMT, data)
+            self._status[agent_id] = "error"
+            return None
+
+        except httpx.HTTPError as e:
+            logger.error("Attempt failed: %s", e)
             await asyncio.sleep(5)
 
+    def _next_delay(self, agent_id: int) -> float:
+        """Seconds until this agent should attempt its next match."""
+        remaining = self._cooldown_until.get(agent_id, 0) - time.time()
+        return max(10.0, remaining)
+
+    async def _agent_loop(self, session: httpx.AsyncClient, agent_id: int,
+                          sem: asyncio.Semaphore) -> None:
+        """Continuously initiate matches for one agent, pacing itself."""
+        while True:
+            try:
+                async with sem:
+                    await self.initiate_match(session, agent_id)
+            except Exception as e:
+                logger.error("Error processing agent %d: %s", agent_id, e)
+                logger.error(traceback.format_exc())
+            await asyncio.sleep(self._next_delay(agent_id))
+
+    async def _summary_loop(self, interval: float = 30.0) -> None:
+        """Emit one aggregated status line instead of a log per agent."""
+        while True:
+            await asyncio.sleep(interval)
+            if self._status:
+                summary = ", ".join(f"{agent_id}={status}" for agent_id, status
+                                    in sorted(self._status.items()))
+                logger.info("cycle summary: %s", summary)
+                self._status.clear()
+
     async def run(self):
         """Main execution flow with connection pooling."""
-        connector = aiohttp.TCPConnector(limit=10)  # Connection pooling
-        async with aiohttp.ClientSession(connector=connector) as session:
-            while True:
-                try:
-                    tasks = [self.initiate_match(session, agent_id) 
-                            for agent_id in self.agent_ids]
-                    results = await asyncio.gather(*tasks, return_exceptions=True)
-                    
-                    # Process results and handle any exceptions
-                    for agent_id, result in zip(self.agent_ids, results):
-                        if isinstance(result, Exception):
-                            logger.error(f"Error processing agent {agent_id}: {result}")
-                        elif result:
-                            logger.info(f"Successfully processed agent {agent_id}")
-                    
-                    logger.info(f"{Fore.WHITE}Completed one full cycle. Starting next...{Style.RESET_ALL}")
-                    await asyncio.sleep(10)  # Prevent too frequent requests
-                
-                except Exception as e:
-                    logger.error(f"Unhandled exception in run loop: {e}")
-                    logger.error(traceback.format_exc())
-                    await asyncio.sleep(60)
+        # HTTP/2 multiplexes the whole agent fan-out over one TLS session;
+        # generous keepalive keeps it warm between attempts.
+        limits = httpx.Limits(
+            max_connections=32,
+            max_keepalive_connections=20,
+            keepalive_expiry=300
+        )
+        async with httpx.AsyncClient(
+            http2=True,
+            limits=limits,
+            timeout=self.timeout
+        ) as session:
+            self._session = session
+            # One long-lived task per agent: each reschedules itself as
+            # soon as it finishes, instead of the whole batch waiting on
+            # the slowest call before a fixed 10s nap.
+            sem = asyncio.Semaphore(8)
+            tasks = [asyncio.create_task(self._agent_loop(session, agent_id, sem))
+                     for agent_id in self.agent_ids]
+            tasks.append(asyncio.create_task(self._summary_loop()))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
 
 async def main():
     # Load configuration
@@ -128,15 +204,15 @@ async def main():
     colorama.init(autoreset=True)
     
     # Read existing token or generate new one
+    token_path = Path("access_token.txt")
     try:
-        with open("access_token.txt", "r") as file:
-            token = file.read().strip()
+        token = (await asyncio.to_thread(token_path.read_text)).strip()
     except FileNotFoundError:
         auth = FractionAIAuth(private_key)
-        token = auth.verify_dapp_auth()
+        async with httpx.AsyncClient(http2=True) as session:
+            token = await auth.verify_dapp_auth(session)
         if token:
-            with open("access_token.txt", "w") as file:
-                file.write(token)
+            await asyncio.to_thread(token_path.write_text, token)
     
     if not token:
         logger.error("Failed to initialize token")
@@ -147,10 +223,16 @@ async def main():
     await game_session.run()
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass  # fall back to the stdlib selector loop
+
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
-        logger.error(f"Critical error: {e}")
+        logger.error("Critical error: %s", e)
         logger.error(traceback.format_exc())
\ No newline at end of file
@@ -0,0 +1,9 @@
+import logging
+
+
+def setup_logging(level: int = logging.INFO) -> None:
+    """Configure the root logger once for the whole process."""
+    logging.basicConfig(
+        level=level,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )